@@ -12,6 +12,7 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 from sklearn.cluster import KMeans
 import joblib
+import segment_store
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -170,6 +171,17 @@ with st.sidebar:
     for k, v in cluster_info.items():
         st.markdown(f"**{k}**  \n{v}")
 
+    st.markdown("---")
+    st.markdown("### 💾 Export Segments")
+    if st.button("Export to Database"):
+        distances = kmeans.transform(X_scaled).min(axis=1)
+        fingerprint = segment_store.model_fingerprint(kmeans, scaler)
+        centroids = scaler.inverse_transform(kmeans.cluster_centers_)
+        written, version = segment_store.export_segments(
+            df['ID'], df['Cluster'], distances, centroids, scaler.scale_, fingerprint
+        )
+        st.success(f"{written:,} changed customers written (export v{version})")
+
 # ===================================
 # CLUSTER DEFINITIONS (Based on actual data analysis)
 # ===================================
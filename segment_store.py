@@ -0,0 +1,153 @@
+"""
+Segment Store
+Persists customer segment assignments to a local SQLite database
+
+Every export gets a new, strictly increasing version number, so
+changed_since(n) always returns everything written after export n. Because
+KMeans is refit on every data change and may renumber its clusters, new
+centroids are matched to the previous export's centroids before diffing, so
+only customers whose segment really moved are written. Matching is skipped
+when the number of clusters changes; labels are then stored as-is.
+"""
+
+import sqlite3
+import hashlib
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+DB_PATH = "segments.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_versions (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT NOT NULL,
+    centroids TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    customer_id INTEGER PRIMARY KEY,
+    cluster INTEGER NOT NULL,
+    model_version INTEGER NOT NULL REFERENCES model_versions(version),
+    distance REAL NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_segments_model_version ON segments(model_version);
+"""
+
+UPSERT_SQL = """
+INSERT INTO segments (customer_id, cluster, model_version, distance, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(customer_id) DO UPDATE SET
+    cluster = excluded.cluster,
+    model_version = excluded.model_version,
+    distance = excluded.distance,
+    updated_at = excluded.updated_at
+"""
+
+
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def model_fingerprint(kmeans, scaler):
+    h = hashlib.sha1()
+    for arr in (kmeans.cluster_centers_, scaler.mean_, scaler.scale_):
+        h.update(np.ascontiguousarray(np.round(arr, 8), dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def previous_centroids(conn):
+    row = conn.execute(
+        "SELECT centroids FROM model_versions ORDER BY version DESC LIMIT 1"
+    ).fetchone()
+    return np.array(json.loads(row[0])) if row else None
+
+
+def match_clusters(centroids, prev_centroids, scale):
+    """Map each new cluster label to the stored id of its nearest previous centroid."""
+    k = len(centroids)
+    if prev_centroids is None or prev_centroids.shape != centroids.shape:
+        return np.arange(k)
+    # Differences are divided by the feature scale so no single feature dominates
+    diff = (centroids[:, None, :] - prev_centroids[None, :, :]) / scale
+    rows, cols = linear_sum_assignment((diff ** 2).sum(axis=2))
+    mapping = np.empty(k, dtype=np.int64)
+    mapping[rows] = cols
+    return mapping
+
+
+def export_segments(ids, clusters, distances, centroids, scale, fingerprint, db_path=DB_PATH):
+    """
+    Upsert customers whose segment is new or changed under a new export version.
+
+    `centroids` are in original feature units and `scale` is the per-feature
+    scale used to compare them. Returns (rows written, export version).
+    """
+    centroids = np.asarray(centroids, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            mapping = match_clusters(centroids, previous_centroids(conn), scale)
+            stored_centroids = np.empty_like(centroids)
+            stored_centroids[mapping] = centroids
+
+            cur = conn.execute(
+                "INSERT INTO model_versions (fingerprint, centroids, created_at) VALUES (?, ?, ?)",
+                (fingerprint, json.dumps(stored_centroids.tolist()), datetime.now().isoformat(timespec="seconds")),
+            )
+            version = cur.lastrowid
+
+            current = pd.DataFrame({
+                "customer_id": np.asarray(ids, dtype=np.int64),
+                "cluster": mapping[np.asarray(clusters, dtype=np.int64)],
+                "distance": np.asarray(distances, dtype=np.float64),
+            })
+            stored = pd.read_sql_query("SELECT customer_id, cluster AS stored_cluster FROM segments", conn)
+
+            merged = current.merge(stored, on="customer_id", how="left")
+            changed = merged[merged["stored_cluster"].isna() | (merged["cluster"] != merged["stored_cluster"])]
+            if changed.empty:
+                return 0, version
+
+            now = datetime.now().isoformat(timespec="seconds")
+            rows = zip(
+                changed["customer_id"].tolist(),
+                changed["cluster"].tolist(),
+                [version] * len(changed),
+                changed["distance"].tolist(),
+                [now] * len(changed),
+            )
+            conn.executemany(UPSERT_SQL, rows)
+            return len(changed), version
+    finally:
+        conn.close()
+
+
+def changed_since(version, db_path=DB_PATH):
+    """Customers written by any export newer than `version`."""
+    conn = connect(db_path)
+    try:
+        return pd.read_sql_query(
+            "SELECT customer_id, cluster, model_version, distance, updated_at "
+            "FROM segments WHERE model_version > ? ORDER BY customer_id",
+            conn,
+            params=(int(version),),
+        )
+    finally:
+        conn.close()
+
+
+def latest_version(db_path=DB_PATH):
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT MAX(version) FROM model_versions").fetchone()
+        return row[0] or 0
+    finally:
+        conn.close()
@@ -0,0 +1,65 @@
+import pytest
+
+import segment_store
+
+CENTROIDS = [[0.0, 0.0], [10.0, 10.0]]
+SCALE = [1.0, 1.0]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "segments.db")
+
+
+def export(db, ids, clusters, centroids=CENTROIDS, fingerprint="a"):
+    distances = [0.5] * len(ids)
+    return segment_store.export_segments(ids, clusters, distances, centroids, SCALE, fingerprint, db_path=db)
+
+
+def test_first_export_inserts_all_rows(db):
+    assert export(db, [1, 2, 3], [0, 1, 0]) == (3, 1)
+    assert len(segment_store.changed_since(0, db_path=db)) == 3
+
+
+def test_identical_reexport_writes_nothing(db):
+    export(db, [1, 2, 3], [0, 1, 0])
+    assert export(db, [1, 2, 3], [0, 1, 0]) == (0, 2)
+
+
+def test_changed_cluster_and_new_id_are_upserted(db):
+    export(db, [1, 2, 3], [0, 1, 0])
+    assert export(db, [1, 2, 3, 4], [1, 1, 0, 0]) == (2, 2)
+
+    rows = segment_store.changed_since(0, db_path=db).set_index("customer_id")
+    assert rows.loc[1, "cluster"] == 1
+    assert rows.loc[4, "cluster"] == 0
+
+
+def test_changed_since_returns_rows_after_version(db):
+    export(db, [1, 2, 3], [0, 1, 0])
+    export(db, [1, 2, 3], [0, 1, 0])
+    export(db, [1, 2, 3, 4], [1, 1, 0, 0])
+
+    assert segment_store.changed_since(1, db_path=db)["customer_id"].tolist() == [1, 4]
+    assert segment_store.changed_since(2, db_path=db)["customer_id"].tolist() == [1, 4]
+    assert segment_store.changed_since(3, db_path=db).empty
+
+
+def test_renumbered_clusters_are_not_rewritten(db):
+    export(db, [1, 2, 3], [0, 1, 0])
+    swapped = [CENTROIDS[1], CENTROIDS[0]]
+    assert export(db, [1, 2, 3], [1, 0, 1], centroids=swapped, fingerprint="b") == (0, 2)
+
+
+def test_reused_fingerprint_gets_new_version(db):
+    export(db, [1, 2, 3], [0, 1, 0], fingerprint="a")
+    shifted = [[1.0, 1.0], [9.0, 9.0]]
+    export(db, [1, 2, 3], [1, 1, 0], centroids=shifted, fingerprint="b")
+
+    written, version = export(db, [1, 2, 3], [0, 1, 0], fingerprint="a")
+    assert (written, version) == (1, 3)
+
+    rows = segment_store.changed_since(2, db_path=db)
+    assert rows["customer_id"].tolist() == [1]
+    assert rows["model_version"].tolist() == [3]
+    assert segment_store.latest_version(db_path=db) == 3